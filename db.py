@@ -1,6 +1,5 @@
 import os
-import psycopg2
-import psycopg2.extras
+import asyncpg
 from dotenv import load_dotenv
 
 # load .env for local
@@ -8,39 +7,56 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# created once at app startup, shared by every request
+pool = None
 
-def get_conn():
-    return psycopg2.connect(
-        DATABASE_URL,
-        cursor_factory=psycopg2.extras.RealDictCursor
+
+async def init_pool():
+    global pool
+    pool = await asyncpg.create_pool(
+        dsn=DATABASE_URL,
+        min_size=5,
+        max_size=20,
+        command_timeout=60,
+        # DATABASE_URL points at PgBouncer in transaction mode, which
+        # can't keep server-side prepared statements between queries
+        statement_cache_size=0
     )
+    return pool
+
 
+async def close_pool():
+    if pool is not None:
+        await pool.close()
 
-def fetch_all(query, params=None):
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(query, params or [])
-        return cur.fetchall()
 
+async def fetch_all(query, *params):
+    async with pool.acquire() as conn:
+        return await conn.fetch(query, *params)
 
-def fetch_one(query, params=None):
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(query, params or [])
-        return cur.fetchone()
 
+async def fetch_one(query, *params):
+    async with pool.acquire() as conn:
+        return await conn.fetchrow(query, *params)
 
-def execute(query, params=None):
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(query, params or [])
-        conn.commit()
 
+async def execute(query, *params):
+    async with pool.acquire() as conn:
+        await conn.execute(query, *params)
 
-def execute_returning(query, params=None):
+
+async def execute_returning(query, *params):
     """
     Run a query that ends with 'RETURNING ...' and get that row back.
     e.g. INSERT ... RETURNING id;
     """
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(query, params or [])
-        row = cur.fetchone()
-        conn.commit()
-        return row
+    async with pool.acquire() as conn:
+        return await conn.fetchrow(query, *params)
+
+
+async def copy_records(table, records, columns):
+    """
+    Bulk-insert rows with a single COPY instead of one INSERT per row.
+    """
+    async with pool.acquire() as conn:
+        await conn.copy_records_to_table(table, records=records, columns=columns)
@@ -1,31 +1,146 @@
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi import FastAPI, Request, Form, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, Response
 from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel, ConfigDict, field_validator
 from dotenv import load_dotenv
+import db
 from db import fetch_all, fetch_one, execute, execute_returning
 import os
-import re
-import requests
-from starlette.middleware.sessions import SessionMiddleware
-from datetime import datetime, date
+import asyncio
+import phonenumbers
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import time
+import base64
+import hashlib
+import httpx
+import orjson
+import jwt
+from aiobreaker import CircuitBreaker, CircuitBreakerError
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from functools import lru_cache
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+from datetime import datetime, date, timedelta
+from urllib.parse import urlencode
 
 
 # Load environment variables
 load_dotenv()
 
+# Logging: callers only enqueue records, a listener thread writes them.
+# The root handler is attached in startup(), not at import: `python main.py`
+# imports this module twice (__main__ and main) and only the app's copy
+# runs the listener.
+_log_queue = queue.Queue(-1)
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_listener = QueueListener(_log_queue, _log_handler)
+_log_queue_handler = QueueHandler(_log_queue)
+logger = logging.getLogger("sms")
+
 # Initialize FastAPI
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 templates = Jinja2Templates(directory="templates")
 
-app.add_middleware(SessionMiddleware, secret_key=os.getenv("SESSION_SECRET", "supersecretkey"))
+
+@app.on_event("startup")
+async def startup():
+    global telnyx_public_key, _LOGIN_HTML, _LOGIN_ETAG, _TELNYX, _outbound_log_queue, _outbound_log_task
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(_log_queue_handler)
+    _log_listener.start()
+    # login page is static, render it once
+    _LOGIN_HTML = templates.get_template("login.html").render({"request": None}).encode()
+    _LOGIN_ETAG = '"' + hashlib.sha256(_LOGIN_HTML).hexdigest()[:32] + '"'
+    if TELNYX_PUBLIC_KEY:
+        telnyx_public_key = Ed25519PublicKey.from_public_bytes(base64.b64decode(TELNYX_PUBLIC_KEY))
+    elif TELNYX_WEBHOOK_VERIFY:
+        raise RuntimeError(
+            "TELNYX_PUBLIC_KEY is not set; set it, or TELNYX_WEBHOOK_VERIFY=0 for local dev"
+        )
+    else:
+        logger.warning("TELNYX_WEBHOOK_VERIFY=0: /api/inbound-sms accepts unsigned webhooks")
+    await db.init_pool()
+    _TELNYX = httpx.AsyncClient(
+        base_url="https://api.telnyx.com",
+        headers={"Authorization": f"Bearer {TELNYX_API_KEY}"},
+        http2=True,
+        timeout=httpx.Timeout(5.0, connect=2.0),
+        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60)
+    )
+    _outbound_log_queue = asyncio.Queue()
+    _outbound_log_task = asyncio.create_task(_flush_outbound_log())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # let the flusher write whatever is still queued
+    await _outbound_log_queue.put(None)
+    await _outbound_log_task
+    await db.close_pool()
+    await _TELNYX.aclose()
+    logging.getLogger().removeHandler(_log_queue_handler)
+    _log_listener.stop()
 
 
 # Environment variables
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
+SESSION_SECRET = os.getenv("SESSION_SECRET", "supersecretkey")
+ADMIN_TOKEN_TTL = 8 * 60 * 60  # seconds
 
 TELNYX_API_KEY = os.getenv("TELNYX_API_KEY")
 TELNYX_MESSAGING_PROFILE_ID = os.getenv("TELNYX_MESSAGING_PROFILE_ID")
 TELNYX_FROM_NUMBER = os.getenv("TELNYX_FROM_NUMBER")
+TELNYX_PUBLIC_KEY = os.getenv("TELNYX_PUBLIC_KEY")
+# only for local dev: TELNYX_WEBHOOK_VERIFY=0 accepts unsigned webhooks
+TELNYX_WEBHOOK_VERIFY = os.getenv("TELNYX_WEBHOOK_VERIFY", "1") != "0"
+TELNYX_SIGNATURE_TOLERANCE = 300  # seconds
+
+# webhook signing key, loaded at startup
+telnyx_public_key = None
+
+# outbound_messages rows waiting to be written, see _flush_outbound_log
+OUTBOUND_LOG_FLUSH_INTERVAL = 0.01  # seconds
+OUTBOUND_LOG_BATCH_MAX = 500
+OUTBOUND_LOG_COLUMNS = ["sale_id", "body", "provider", "provider_sid"]
+_outbound_log_queue = None
+_outbound_log_task = None
+
+# pre-rendered login page, filled in at startup
+_LOGIN_HTML = b""
+_LOGIN_ETAG = None
+
+# one keep-alive HTTP/2 connection pool to Telnyx, created at startup
+# (and closed at shutdown) so each app lifespan gets a fresh one
+_TELNYX = None
+
+# stop calling Telnyx for a while after repeated failures (outages)
+_TELNYX_BREAKER = CircuitBreaker(fail_max=5, timeout_duration=timedelta(seconds=30))
+
+
+# ======================
+# Request Models
+# ======================
+
+class NewSaleIn(BaseModel):
+    # CRMs send ids as numbers or strings; store them as text either way
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    saleId: str | None = None
+    phone: str
+    agent: str | None = None
+    office: str | None = None
+    source: str | None = None
+    healthId: str | None = None
+    planType: str | None = None
+
+    @field_validator("phone")
+    @classmethod
+    def _normalize_phone(cls, v: str) -> str:
+        return normalize_phone(v)
 
 
 # ======================
@@ -33,22 +148,34 @@ TELNYX_FROM_NUMBER = os.getenv("TELNYX_FROM_NUMBER")
 # ======================
 
 def normalize_phone(raw: str) -> str:
-    """Normalize raw phone input into +1XXXXXXXXXX format."""
-    digits = re.sub(r"\D", "", raw or "")
-    if len(digits) == 10:
-        return "+1" + digits
-    elif len(digits) == 11 and digits.startswith("1"):
-        return "+" + digits
-    return "+" + digits
+    """Parse raw phone input (US by default) into E.164, e.g. +13055550123."""
+    try:
+        parsed = phonenumbers.parse(raw, "US")
+    except phonenumbers.NumberParseException as e:
+        raise ValueError(f"invalid phone number: {e}") from e
+    if not phonenumbers.is_valid_number(parsed):
+        raise ValueError("invalid phone number")
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    # Only retry when Telnyx never accepted the message. Retrying a read
+    # timeout or a 5xx could text the customer twice.
+    if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return True
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429
+
+
+async def _post_message(data: dict) -> httpx.Response:
+    response = await _TELNYX.post("/v2/messages", json=data)
+    # 429/5xx count against the breaker; other 4xx are our own fault
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()
+    return response
 
 
-def send_sms_via_telnyx(to_number: str, message: str):
+async def send_sms_via_telnyx(to_number: str, message: str):
     """Send an SMS using the Telnyx Messaging API v2."""
-    url = "https://api.telnyx.com/v2/messages"
-    headers = {
-        "Authorization": f"Bearer {TELNYX_API_KEY}",
-        "Content-Type": "application/json"
-    }
     data = {
     "from": TELNYX_FROM_NUMBER,
     "to": to_number,
@@ -58,13 +185,122 @@ def send_sms_via_telnyx(to_number: str, message: str):
 
 
     try:
-        response = requests.post(url, json=data, headers=headers)
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(3),
+            wait=wait_exponential_jitter(initial=0.1, max=2),
+            retry=retry_if_exception(_is_retryable),
+            reraise=True
+        ):
+            with attempt:
+                response = await _TELNYX_BREAKER.call_async(_post_message, data)
         response.raise_for_status()
-        print("✅ Telnyx message sent successfully:", response.json())
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print("❌ Telnyx send failed:", e)
+        result = response.json()
+        logger.info("Telnyx message sent: %s", result.get("data", {}).get("id"))
+        return result
+    except CircuitBreakerError:
+        logger.warning("Telnyx send skipped: circuit open")
+        return {"data": {"id": "FAILED"}}
+    except (ValueError, AttributeError) as e:
+        # 2xx with a non-JSON or unexpectedly shaped body
+        logger.warning("Telnyx returned an unexpected response: %s", e)
         return {"data": {"id": "FAILED"}}
+    except httpx.HTTPError as e:
+        logger.warning("Telnyx send failed: %s", e)
+        return {"data": {"id": "FAILED"}}
+
+
+def issue_admin_token() -> str:
+    """Sign a short-lived HS256 token for the admin cookie."""
+    now = int(time.time())
+    claims = {"sub": "admin", "iat": now, "exp": now + ADMIN_TOKEN_TTL}
+    return jwt.encode(claims, SESSION_SECRET, algorithm="HS256")
+
+
+@lru_cache(maxsize=1024)
+def _admin_token_expiry(token: str) -> int:
+    """Verify a token once and remember its expiry (0 if invalid)."""
+    try:
+        claims = jwt.decode(token, SESSION_SECRET, algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        return 0
+    return claims["exp"]
+
+
+def is_admin(request: Request) -> bool:
+    token = request.cookies.get("admin_token")
+    return bool(token) and _admin_token_expiry(token) > time.time()
+
+
+async def verify_telnyx_signature(request: Request):
+    """Reject webhooks not signed by Telnyx before any DB work."""
+    if not TELNYX_WEBHOOK_VERIFY:
+        return
+    if telnyx_public_key is None:
+        raise HTTPException(status_code=401, detail="Signature verification not configured")
+
+    signature = request.headers.get("telnyx-signature-ed25519")
+    timestamp = request.headers.get("telnyx-timestamp")
+    if not signature or not timestamp:
+        raise HTTPException(status_code=401, detail="Missing signature")
+
+    try:
+        if abs(time.time() - int(timestamp)) > TELNYX_SIGNATURE_TOLERANCE:
+            raise HTTPException(status_code=401, detail="Stale signature")
+        message = timestamp.encode() + b"|" + await request.body()
+        telnyx_public_key.verify(base64.b64decode(signature), message)
+    except (ValueError, InvalidSignature):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+
+async def _send_and_log(sale_id: int, to_number: str, message: str):
+    """Send an SMS and record it in outbound_messages."""
+    outbound_resp = await send_sms_via_telnyx(to_number, message)
+    provider_sid = outbound_resp.get("data", {}).get("id", "FAILED")
+
+    _outbound_log_queue.put_nowait((sale_id, message, "telnyx", provider_sid))
+
+
+async def log_outbound_batch(rows):
+    """Write many outbound_messages rows in one COPY."""
+    await db.copy_records("outbound_messages", rows, OUTBOUND_LOG_COLUMNS)
+
+
+async def _flush_outbound_log():
+    """
+    Background writer for outbound_messages. Rows that arrive within
+    OUTBOUND_LOG_FLUSH_INTERVAL of each other go out in one COPY. A None
+    in the queue flushes what is left and stops the loop.
+    """
+    stopping = False
+    while not stopping:
+        rows = [await _outbound_log_queue.get()]
+        await asyncio.sleep(OUTBOUND_LOG_FLUSH_INTERVAL)
+        while not _outbound_log_queue.empty() and len(rows) < OUTBOUND_LOG_BATCH_MAX:
+            rows.append(_outbound_log_queue.get_nowait())
+
+        if None in rows:
+            stopping = True
+            rows = [row for row in rows if row is not None]
+        if not rows:
+            continue
+
+        try:
+            await log_outbound_batch(rows)
+        except Exception:
+            # COPY is all-or-nothing; retry row by row so one bad row
+            # (e.g. its sale was deleted mid-send) only loses itself
+            logger.exception("Batch log of %d outbound messages failed, retrying per row", len(rows))
+            for row in rows:
+                try:
+                    await execute(
+                        """
+                        INSERT INTO outbound_messages (sale_id, body, provider, provider_sid)
+                        VALUES ($1, $2, $3, $4);
+                        """,
+                        *row
+                    )
+                except Exception:
+                    logger.exception("Failed to log outbound message for sale %s", row[0])
 
 
 # ======================
@@ -73,15 +309,25 @@ def send_sms_via_telnyx(to_number: str, message: str):
 
 @app.get("/", response_class=HTMLResponse)
 async def login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    headers = {"Cache-Control": "public, max-age=300", "ETag": _LOGIN_ETAG}
+    if request.headers.get("if-none-match") == _LOGIN_ETAG:
+        return Response(status_code=304, headers=headers)
+    return Response(_LOGIN_HTML, media_type="text/html", headers=headers)
 
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
 
 @app.post("/login")
 async def login(request: Request, username: str = Form(...), password: str = Form(...)):
     if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
-        request.session["logged_in"] = True
-        return RedirectResponse(url="/admin", status_code=303)
+        response = RedirectResponse(url="/admin", status_code=303)
+        response.set_cookie(
+            "admin_token",
+            issue_admin_token(),
+            max_age=ADMIN_TOKEN_TTL,
+            httponly=True,
+            samesite="lax"
+        )
+        return response
     else:
         return HTMLResponse("<h3>Invalid credentials</h3>", status_code=401)
 
@@ -97,10 +343,13 @@ async def admin_home(
     from_date: str = None,
     to_date: str = None,
     today: bool = False,
-    search: str = None
+    search: str = None,
+    after: str = None
 ):
-    if not request.session.get("logged_in"):
+    if not is_admin(request):
         return RedirectResponse(url="/", status_code=303)
+    if limit < 1:
+        return HTMLResponse("<h3>Invalid limit</h3>", status_code=400)
 
     query = """
         SELECT id, phone, health_id, office, plan_type, created_on
@@ -112,26 +361,48 @@ async def admin_home(
     if today:
         where_clauses.append("DATE(created_on) = CURRENT_DATE")
     if from_date and to_date:
-        where_clauses.append("DATE(created_on) BETWEEN %s AND %s")
-        params.extend([from_date, to_date])
+        params.extend([date.fromisoformat(from_date), date.fromisoformat(to_date)])
+        where_clauses.append(f"DATE(created_on) BETWEEN ${len(params) - 1} AND ${len(params)}")
     elif from_date:
-        where_clauses.append("DATE(created_on) >= %s")
-        params.append(from_date)
+        params.append(date.fromisoformat(from_date))
+        where_clauses.append(f"DATE(created_on) >= ${len(params)}")
     elif to_date:
-        where_clauses.append("DATE(created_on) <= %s")
-        params.append(to_date)
+        params.append(date.fromisoformat(to_date))
+        where_clauses.append(f"DATE(created_on) <= ${len(params)}")
     if search:
-        where_clauses.append("(phone ILIKE %s OR health_id ILIKE %s)")
-        search_term = f"%{search}%"
-        params.extend([search_term, search_term])
+        params.append(f"%{search}%")
+        where_clauses.append(f"(phone ILIKE ${len(params)} OR health_id ILIKE ${len(params)})")
+    if after:
+        # keyset cursor "<created_on>,<id>" of the last row on the previous page
+        try:
+            after_created_on, after_id = after.rsplit(",", 1)
+            after_created_on = datetime.fromisoformat(after_created_on)
+            after_id = int(after_id)
+        except ValueError:
+            return HTMLResponse("<h3>Invalid page cursor</h3>", status_code=400)
+        params.extend([after_created_on, after_id])
+        where_clauses.append(f"(created_on, id) < (${len(params) - 1}, ${len(params)})")
 
     if where_clauses:
         query += " WHERE " + " AND ".join(where_clauses)
 
-    query += " ORDER BY created_on DESC LIMIT %s;"
     params.append(limit)
+    query += f" ORDER BY created_on DESC, id DESC LIMIT ${len(params)};"
+
+    sales_rows = await fetch_all(query, *params)
 
-    sales_rows = fetch_all(query, tuple(params))
+    next_url = None
+    if len(sales_rows) == limit:
+        last = sales_rows[-1]
+        next_params = {
+            "limit": limit,
+            "from_date": from_date,
+            "to_date": to_date,
+            "today": "true" if today else None,
+            "search": search,
+            "after": f"{last['created_on'].isoformat()},{last['id']}"
+        }
+        next_url = "/admin?" + urlencode({k: v for k, v in next_params.items() if v})
 
     return templates.TemplateResponse(
         "admin_home.html",
@@ -141,7 +412,8 @@ async def admin_home(
             "limit": limit,
             "from_date": from_date,
             "to_date": to_date,
-            "search": search
+            "search": search,
+            "next_url": next_url
         }
     )
 
@@ -152,71 +424,49 @@ async def admin_home(
 # ======================
 
 @app.post("/api/new-sale")
-async def new_sale(request: Request):
+async def new_sale(sale: NewSaleIn, bg: BackgroundTasks):
     """
     Submit-a-Sale POST endpoint.
     """
-    body = await request.json()
-    raw_phone = body.get("phone")
-    clean_phone = normalize_phone(raw_phone)
+    clean_phone = sale.phone  # already E.164, see NewSaleIn
 
-    existing = fetch_one(
-        "SELECT id, opted_out FROM sales WHERE phone = %s;", (clean_phone,)
+    # Insert or update in one round-trip. An opted-out row is left
+    # untouched, so the conflict update returns nothing for it.
+    row = await execute_returning(
+        """
+        INSERT INTO sales
+            (external_sale_id, phone, agent_name, office, source, health_id, plan_type)
+        VALUES
+            ($1, $2, $3, $4, $5, $6, $7)
+        ON CONFLICT (phone) DO UPDATE
+        SET
+            external_sale_id = EXCLUDED.external_sale_id,
+            agent_name = EXCLUDED.agent_name,
+            office = EXCLUDED.office,
+            source = EXCLUDED.source,
+            health_id = EXCLUDED.health_id,
+            plan_type = EXCLUDED.plan_type
+        WHERE sales.opted_out IS NOT TRUE
+        RETURNING id, opted_out;
+        """,
+        sale.saleId,
+        clean_phone,
+        sale.agent,
+        sale.office,
+        sale.source,
+        sale.healthId,
+        sale.planType
     )
 
     # Skip if opted out
-    if existing and existing["opted_out"]:
-        return JSONResponse({
+    if row is None or row["opted_out"]:
+        return ORJSONResponse({
             "ok": True,
             "skipped_send": True,
             "reason": "opted_out"
         })
 
-    # Insert or update
-    if existing:
-        sale_id = existing["id"]
-        execute(
-            """
-            UPDATE sales
-            SET
-                external_sale_id = %s,
-                agent_name = %s,
-                office = %s,
-                source = %s,
-                health_id = %s,
-                plan_type = %s
-            WHERE id = %s;
-            """,
-            (
-                body.get("saleId"),
-                body.get("agent"),
-                body.get("office"),
-                body.get("source"),
-                body.get("healthId"),
-                body.get("planType"),
-                sale_id
-            )
-        )
-    else:
-        row = execute_returning(
-            """
-            INSERT INTO sales
-                (external_sale_id, phone, agent_name, office, source, health_id, plan_type)
-            VALUES
-                (%s, %s, %s, %s, %s, %s, %s)
-            RETURNING id;
-            """,
-            (
-                body.get("saleId"),
-                clean_phone,
-                body.get("agent"),
-                body.get("office"),
-                body.get("source"),
-                body.get("healthId"),
-                body.get("planType")
-            )
-        )
-        sale_id = row["id"]
+    sale_id = row["id"]
 
     # Send first SMS
     text_msg = (
@@ -224,22 +474,14 @@ async def new_sale(request: Request):
         "Reply STOP to opt out."
     )
 
-    outbound_resp = send_sms_via_telnyx(clean_phone, text_msg)
-    provider_sid = outbound_resp.get("data", {}).get("id", "FAILED")
+    # Send and log after the response goes out
+    bg.add_task(_send_and_log, sale_id, clean_phone, text_msg)
 
-    execute(
-        """
-        INSERT INTO outbound_messages (sale_id, body, provider, provider_sid)
-        VALUES (%s, %s, %s, %s);
-        """,
-        (sale_id, text_msg, "telnyx", provider_sid)
-    )
-
-    return JSONResponse({
+    return ORJSONResponse({
         "ok": True,
         "sale_id": sale_id,
         "sent_to": clean_phone,
-        "provider_sid": provider_sid,
+        "provider_sid": "PENDING",
         "skipped_send": False
     })
 
@@ -248,59 +490,78 @@ async def new_sale(request: Request):
 # API: Inbound Webhook
 # ======================
 
-@app.post("/api/inbound-sms")
+@app.post("/api/inbound-sms", dependencies=[Depends(verify_telnyx_signature)])
 async def inbound_sms(request: Request):
     """
     Telnyx webhook handler for inbound messages.
     """
-    payload = await request.json()
+    payload = orjson.loads(await request.body())
     data = payload.get("data", {}).get("payload", {})
 
-    from_phone = data.get("from", {}).get("phone_number")
+    # Telnyx sends E.164 and sales.phone is stored that way, so no
+    # normalization is needed before the lookup
+    from_phone = data.get("from", {}).get("phone_number", "")
     body = data.get("text", "")
 
-    clean_from = normalize_phone(from_phone)
-
-    sale_row = fetch_one("SELECT id FROM sales WHERE phone = %s;", (clean_from,))
-    sale_id = sale_row["id"] if sale_row else None
-
-    execute(
-        "INSERT INTO inbound_messages (sale_id, from_phone, body) VALUES (%s, %s, %s);",
-        (sale_id, clean_from, body)
+    # Log the message and apply STOP in one round-trip
+    await execute(
+        """
+        WITH ins AS (
+            INSERT INTO inbound_messages (sale_id, from_phone, body)
+            VALUES ((SELECT id FROM sales WHERE phone = $1), $1, $2)
+        )
+        UPDATE sales SET opted_out = TRUE
+        WHERE phone = $1 AND $3::boolean;
+        """,
+        from_phone, body, body.strip().upper() == "STOP"
     )
 
-    if body.strip().upper() == "STOP":
-        execute("UPDATE sales SET opted_out = TRUE WHERE phone = %s;", (clean_from,))
-
     return {"ok": True}
 
 
 @app.get("/logout")
 async def logout(request: Request):
-    request.session.clear()
-    return RedirectResponse(url="/", status_code=303)
+    response = RedirectResponse(url="/", status_code=303)
+    response.delete_cookie("admin_token")
+    return response
 
 @app.get("/admin/delete/{sale_id}")
 async def delete_sale(request: Request, sale_id: int):
-    if not request.session.get("logged_in"):
+    if not is_admin(request):
         return RedirectResponse(url="/", status_code=303)
 
-    execute("DELETE FROM sales WHERE id = %s;", (sale_id,))
+    await execute("DELETE FROM sales WHERE id = $1;", sale_id)
     return RedirectResponse(url="/admin", status_code=303)
 
 
 @app.get("/admin/resend/{sale_id}")
 async def resend_sms(request: Request, sale_id: int):
-    if not request.session.get("logged_in"):
+    if not is_admin(request):
         return RedirectResponse(url="/", status_code=303)
 
-    sale = fetch_one("SELECT phone FROM sales WHERE id = %s;", (sale_id,))
+    sale = await fetch_one("SELECT phone FROM sales WHERE id = $1;", sale_id)
     if not sale:
         return HTMLResponse("<h3>Sale not found</h3>", status_code=404)
 
     phone = sale["phone"]
     text_msg = "Thank you for enrolling! We're here to help with your coverage. Reply STOP to opt out."
-    send_sms_via_telnyx(phone, text_msg)
+    await send_sms_via_telnyx(phone, text_msg)
 
     # ✅ redirect with query string
-    return RedirectResponse(url="/admin?msg=sent", status_code=303)
\ No newline at end of file
+    return RedirectResponse(url="/admin?msg=sent", status_code=303)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # uvloop + httptools come with uvicorn[standard]. One worker unless
+    # WEB_CONCURRENCY says otherwise: os.cpu_count() is the host's count
+    # in a container, and each worker opens up to 20 DB connections.
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1"))
+    )
@@ -0,0 +1,36 @@
+-- Run this file outside a transaction block: CONCURRENTLY builds don't
+-- block writes but can't run inside BEGIN/COMMIT. If a concurrent build
+-- fails it leaves an INVALID index behind; drop it before re-running.
+
+-- one sale per phone; lets /api/new-sale upsert with ON CONFLICT (phone).
+-- INCLUDE makes the phone -> (id, opted_out) probes index-only.
+-- Build the new index before dropping the old one so ON CONFLICT always
+-- has a unique index to match.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS sales_phone_covering_uniq ON sales (phone) INCLUDE (id, opted_out);
+DROP INDEX CONCURRENTLY IF EXISTS sales_phone_uniq;
+
+-- admin keyset paging needs a created_on on every row
+UPDATE sales SET created_on = now() WHERE created_on IS NULL;
+ALTER TABLE sales ALTER COLUMN created_on SET DEFAULT now();
+ALTER TABLE sales ALTER COLUMN created_on SET NOT NULL;
+
+-- admin list: ORDER BY created_on DESC, id DESC with (created_on, id)
+-- keyset paging. New index first, then drop the old ones.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sales_created_on_id_desc ON sales (created_on DESC, id DESC);
+DROP INDEX CONCURRENTLY IF EXISTS sales_created_on_desc;
+DROP INDEX CONCURRENTLY IF EXISTS sales_created_on_id_nulls_last;
+
+-- phones are stored as E.164 only (normalized by phonenumbers on insert).
+-- NOT VALID skips the full-table check of existing rows; run
+-- VALIDATE CONSTRAINT once legacy rows are cleaned up.
+-- Only added when missing, so re-runs keep an already validated constraint.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conname = 'phone_e164' AND conrelid = 'sales'::regclass
+    ) THEN
+        ALTER TABLE sales ADD CONSTRAINT phone_e164 CHECK (phone ~ '^\+[1-9][0-9]{7,14}$') NOT VALID;
+    END IF;
+END
+$$;